@@ -1,86 +1,96 @@
-
-from decimal import Decimal
 import logging
-from fastapi import APIRouter, HTTPException, Path
-from pydantic import BaseModel, StrictInt, StrictFloat, field_validator
-from typing import Union
-
+from typing import Callable
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
+from starlette.types import Scope
+
+from .db import run_read, run_write
+from .domain import AccountBalance, AccountID, Money, CreateBody, as_number, to_cents
 from .repo import get_balance as repo_get_balance
 from .repo import deposit as repo_deposit
 from .repo import withdraw as repo_withdraw
 from .repo import create_account as repo_create_account
 
 log = logging.getLogger("api")
-router = APIRouter()
 
-# same account id constraints you use elsewhere
-AccountID = Path(..., min_length=1, max_length=64, pattern=r"^[A-Za-z0-9_\-]+$")
-
-def as_number(d: Decimal) -> float:
-    # repo/db already quantize to 2dp; safeguard here anyway
-    return float(d)
-
-class Money(BaseModel):
-    amount: Union[StrictInt, StrictFloat]
-    @field_validator("amount")
-    @classmethod
-    def positive(cls, v):
-        if v <= 0:
-            raise ValueError("amount must be > 0")
-        return v
-
-class CreateBody(BaseModel):
-    # optional initial balance; default 0
-    initial_balance: Union[StrictInt, StrictFloat] | None = 0
-    @field_validator("initial_balance")
-    @classmethod
-    def non_negative(cls, v):
-        if v is None:
-            return 0
-        if v < 0:
-            raise ValueError("initial_balance must be >= 0")
-        return v
+def is_json_request(scope: Scope) -> bool:
+    """True if the raw Content-Type header is application/json (parameters ignored)."""
+    for key, value in scope["headers"]:
+        if key == b"content-type":
+            return value.partition(b";")[0].strip().lower() == b"application/json"
+    return False
 
+class JSONOnlyRoute(APIRoute):
+    """Rejects non-JSON bodies (415) before the body is parsed, to keep the API contract strict.
+    Only the write routes use it, so GETs don't pay for the check."""
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def json_only_handler(request: Request) -> Response:
+            if not is_json_request(request.scope):
+                if log.isEnabledFor(logging.WARNING):
+                    log.warning("Unsupported media type: %s %s", request.method, request.scope["path"])
+                raise HTTPException(status_code=415, detail="Content-Type must be application/json")
+            return await handler(request)
+
+        return json_only_handler
+
+router = APIRouter()
+write_router = APIRouter(route_class=JSONOnlyRoute)
+
+# Constant bodies (liveness probes hit these constantly): serialized once, and the
+# same Response is returned every time. Middleware must not mutate it.
+_ROOT = Response(
+    content=b'{"status":"ok","message":"Welcome to the ATM API","docs":"/docs"}',
+    media_type="application/json",
+)
+_HEALTH = Response(content=b'{"status":"ok"}', media_type="application/json")
 
 @router.get("/")
-def root():
-    return {"status": "ok", "message": "Welcome to the ATM API", "docs": "/docs"}
+async def root():
+    return _ROOT
 
 
 @router.get("/health")
-def health():
-    return {"status": "ok"}
-
+async def health():
+    return _HEALTH
 
-from .domain import as_number  # ensure import
+def _balance(account_number: str, cents: int) -> AccountBalance:
+    # Both fields are already the right types (validated id, float from as_number):
+    # skip the constructor's validation pass; FastAPI serializes it via pydantic-core.
+    return AccountBalance.model_construct(account_number=account_number, balance=as_number(cents))
 
 @router.get("/accounts/{account_number}/balance")
-def get_balance(account_number: str = AccountID):
-    bal = repo_get_balance(account_number)
+async def get_balance(account_number: AccountID) -> AccountBalance:
+    bal = await run_read(repo_get_balance, account_number)
     if bal is None:
         # not found -> 404
         raise HTTPException(status_code=404, detail=f"Account '{account_number}' does not exist")
-    return {"account_number": account_number, "balance": as_number(bal)}
+    return _balance(account_number, bal)
 
-@router.post("/accounts/{account_number}/deposit")
-def deposit(account_number: str = AccountID, body: Money = ...):
-    new_bal = repo_deposit(account_number, Decimal(str(body.amount)))
+@write_router.post("/accounts/{account_number}/deposit")
+async def deposit(account_number: AccountID, body: Money = ...) -> AccountBalance:
+    new_bal = await run_write(repo_deposit, account_number, to_cents(body.amount))
     # repo_deposit raises 404 if account missing
-    return {"account_number": account_number, "balance": as_number(new_bal)}
+    return _balance(account_number, new_bal)
 
-@router.post("/accounts/{account_number}/withdraw")
-def withdraw(account_number: str = AccountID, body: Money = ...):
-    new_bal = repo_withdraw(account_number, Decimal(str(body.amount)))
+@write_router.post("/accounts/{account_number}/withdraw")
+async def withdraw(account_number: AccountID, body: Money = ...) -> AccountBalance:
+    new_bal = await run_write(repo_withdraw, account_number, to_cents(body.amount))
     # repo_withdraw raises 404 if account missing, 400 if insufficient funds
-    return {"account_number": account_number, "balance": as_number(new_bal)}
+    return _balance(account_number, new_bal)
 
-@router.post("/accounts/{account_number}")
-def create_account(account_number: str = AccountID, body: CreateBody = CreateBody()):
-    initial = Decimal(str(body.initial_balance or 0))
+@write_router.post("/accounts/{account_number}")
+async def create_account(account_number: AccountID, body: CreateBody = CreateBody()) -> AccountBalance:
+    initial = to_cents(body.initial_balance)
     try:
-        bal = repo_create_account(account_number, initial)
+        bal = await run_write(repo_create_account, account_number, initial)
     except HTTPException:
         # let repo raise 409 if exists (your repo/db should do that)
         raise
-    log.info("create account id=%s initial=%s -> %s", account_number, initial, bal)
-    return {"account_number": account_number, "balance": as_number(bal)}
\ No newline at end of file
+    log.info("create account id=%s initial_cents=%s -> %s", account_number, initial, bal)
+    return _balance(account_number, bal)
+
+
+router.include_router(write_router)
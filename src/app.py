@@ -1,17 +1,19 @@
+import json
 import logging
-import uuid
 import os
+import random
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+from starlette.datastructures import Headers
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .api import router
-from .db import init_db, seed_if_empty
-from .logger_config import setup_logging
+from .db import init_db, reset_connection, seed_if_empty
+from .logger_config import request_id_var, setup_logging
 
 setup_logging()
 log = logging.getLogger("app")
@@ -29,38 +31,49 @@ STATUS_TO_CODE = {
 def code_for(status: int) -> str:
     return STATUS_TO_CODE.get(status, f"HTTP_{status}")
 
-def error_response(status: int, message: str) -> JSONResponse:
-    return JSONResponse(
-        status_code=status,
-        content={"error": {"code": code_for(status), "message": message}},
-    )
-
-class EnforceJSONMiddleware(BaseHTTPMiddleware):
-    """Rejects non-JSON bodies for mutating methods to keep API contract strict."""
-    async def dispatch(self, request: Request, call_next):
-        if request.method in {"POST", "PUT", "PATCH"}:
-            ct = request.headers.get("content-type", "").split(";")[0].strip().lower()
-            if ct != "application/json":
-                log.warning("Unsupported media type: %s %s", request.method, request.url.path)
-                return error_response(415, "Content-Type must be application/json")
-        return await call_next(request)
-
-class RequestIDMiddleware(BaseHTTPMiddleware):
+def _error_template(status: int) -> bytes:
+    return b'{"error":{"code":"%s","message":%%s}}' % code_for(status).encode()
+
+# Error bodies only differ by message; build the envelope once per known status.
+_ERR_TEMPLATES = {status: _error_template(status) for status in STATUS_TO_CODE}
+
+def error_response(status: int, message: str) -> Response:
+    template = _ERR_TEMPLATES.get(status) or _error_template(status)
+    body = template % json.dumps(message, ensure_ascii=False).encode("utf-8")
+    return Response(content=body, status_code=status, media_type="application/json")
+
+# Request ids only need to be unique, not secret: a seeded PRNG avoids an
+# os.urandom() syscall per request. Reseeded in forked workers so they don't
+# replay the parent's sequence.
+_rid_rng = random.Random(os.urandom(32))
+os.register_at_fork(after_in_child=lambda: _rid_rng.seed(os.urandom(32)))
+
+def new_request_id() -> str:
+    return f"{_rid_rng.getrandbits(128):032x}"
+
+class RequestIDMiddleware:
     """Adds a stable request id (from header or generated) into logs and response headers."""
-    async def dispatch(self, request: Request, call_next):
-        rid = request.headers.get("x-request-id") or str(uuid.uuid4())
-        old_factory = logging.getLogRecordFactory()
-        def record_factory(*args, **kwargs):
-            rec = old_factory(*args, **kwargs)
-            rec.request_id = rid
-            return rec
-        logging.setLogRecordFactory(record_factory)
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rid = Headers(scope=scope).get("x-request-id") or new_request_id()
+        rid_header = (b"x-request-id", rid.encode("latin-1"))
+
+        async def send_with_rid(message: Message):
+            if message["type"] == "http.response.start":
+                # copy, never append: responses may be shared across requests
+                message = {**message, "headers": [*message.get("headers", ()), rid_header]}
+            await send(message)
+
+        token = request_id_var.set(rid)
         try:
-            response = await call_next(request)
-            response.headers["X-Request-ID"] = rid
-            return response
+            await self.app(scope, receive, send_with_rid)
         finally:
-            logging.setLogRecordFactory(old_factory)
+            request_id_var.reset(token)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -72,12 +85,13 @@ async def lifespan(app: FastAPI):
     try:
         yield
     finally:
+        # in-flight requests have drained; closing the last connection checkpoints the WAL
+        reset_connection()
         log.info("🛑 ATM API stopped")
 
 def create_app() -> FastAPI:
     app = FastAPI(title="ATM System", lifespan=lifespan)
     app.add_middleware(RequestIDMiddleware)
-    app.add_middleware(EnforceJSONMiddleware)
 
     @app.exception_handler(RequestValidationError)
     async def validation_handler(_: Request, exc: RequestValidationError):
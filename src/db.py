@@ -1,132 +1,313 @@
-import os, sqlite3, logging
-from contextlib import closing
+import asyncio, atexit, contextvars, os, queue, sqlite3, logging, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from decimal import Decimal
+from functools import partial
+
+from .domain import to_cents
 
 log = logging.getLogger("db")
 
 def _db_path() -> str:
     return os.environ.get("ATM_DB_PATH", os.path.join(os.getcwd(), "data", "atm.db"))
 
+# One long-lived writer connection (all writes, serialized by _write_lock) plus a
+# small pool of reader connections; under WAL readers never block the writer.
 _conn = None
+_conn_lock = threading.Lock()
+_write_lock = threading.Lock()
+_READ_POOL_SIZE = 4
+_read_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=_READ_POOL_SIZE)
+
+# Async handlers hop onto these: one writer thread keeps writes FIFO and never
+# contending for SQLite's write lock; readers run in parallel.
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_read_executor = ThreadPoolExecutor(max_workers=_READ_POOL_SIZE, thread_name_prefix="db-reader")
 
 def reset_connection():
-    """Drop the cached connection so subsequent calls reopen with the current DB_PATH."""
+    """Drop the cached connections so subsequent calls reopen with the current DB_PATH."""
     global _conn
-    if _conn is not None:
-        try: _conn.close()
-        except Exception: pass
-    _conn = None
+    with _write_lock, _cache_lock:
+        if _conn is not None:
+            try: _conn.close()
+            except Exception: pass
+        _conn = None
+        _cache.clear()
+        while True:
+            try: _read_pool.get_nowait().close()
+            except queue.Empty: break
+
+atexit.register(reset_connection)
 
 def _ensure_parent_dir(path: str):
     parent = os.path.dirname(path)
     if parent:
         os.makedirs(parent, exist_ok=True)
 
+# Applied to every new connection in one call. The tuning pragmas are safe with
+# WAL + synchronous=NORMAL: they only trade memory for fewer page reads, and
+# busy_timeout makes other workers wait for the write lock instead of SQLITE_BUSY.
+_PRAGMA_SCRIPT = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA foreign_keys=ON;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-65536;  -- 64 MiB page cache (negative = KiB)
+    PRAGMA temp_store=MEMORY;
+"""
+
 def _open_conn() -> sqlite3.Connection:
     path = _db_path()
-    _ensure_parent_dir(path)
-    # autocommit; we control BEGIN/COMMIT in ops
-    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    conn.execute("PRAGMA foreign_keys=ON;")
+    # "file:..." is a URI, e.g. "file:atm_test?mode=memory&cache=shared" for tests
+    uri = path.startswith("file:")
+    if not uri:
+        _ensure_parent_dir(path)
+    # autocommit: single-statement writes commit on their own; init_db opens its own transaction
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256, uri=uri)
+    conn.executescript(_PRAGMA_SCRIPT)
+    try:
+        conn.execute("PRAGMA mmap_size=268435456;")  # 256 MiB: the whole DB is read via mmap
+    except sqlite3.DatabaseError:
+        log.debug("mmap_size not supported here; using regular reads")
     return conn
 
+def _writer() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        with _conn_lock:
+            if _conn is None:
+                _conn = _open_conn()
+    return _conn
+
+@contextmanager
+def _reader():
+    """Check a reader connection out of the pool (opening one if it is empty)."""
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = _open_conn()
+        conn.execute("PRAGMA query_only=ON;")  # readers never take the write lock
+    try:
+        yield conn
+    finally:
+        try:
+            _read_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+async def run_read(fn, *args):
+    """Run a blocking read on the reader pool (keeps the request's contextvars, e.g. request id)."""
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_read_executor, partial(ctx.run, fn, *args))
+
+async def run_write(fn, *args):
+    """Run a blocking write on the single writer thread."""
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_write_executor, partial(ctx.run, fn, *args))
+
+# Balances are stored as INTEGER cents so SQLite does the arithmetic natively and exactly.
+# deposit() keeps every balance <= MAX_BALANCE_CENTS; the CHECK is the backstop against
+# int64 overflow, which SQLite would otherwise silently turn into REAL.
+MAX_BALANCE_CENTS = 2**63 - 1
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS accounts (
+        id      TEXT PRIMARY KEY,
+        balance INTEGER NOT NULL CHECK (typeof(balance) = 'integer')
+    )
+"""
+
+# Every statement is a constant; the same text every call keeps sqlite3's per-connection
+# statement cache hitting instead of re-preparing.
+_SQL_EXISTS = "SELECT EXISTS(SELECT 1 FROM accounts WHERE id=?)"
+_SQL_GET_BALANCE = "SELECT balance FROM accounts WHERE id=?"
+# The third parameter is MAX_BALANCE_CENTS - cents: the sum must stay an int64.
+_SQL_DEPOSIT = "UPDATE accounts SET balance = balance + ? WHERE id = ? AND balance <= ? RETURNING balance"
+_SQL_WITHDRAW = "UPDATE accounts SET balance = balance - ? WHERE id = ? AND balance >= ? RETURNING balance"
+_SQL_INSERT = "INSERT INTO accounts (id, balance) VALUES (?, ?)"
+_SQL_COUNT = "SELECT COUNT(*) FROM accounts"
+_SQL_TRUNCATE = "DELETE FROM accounts"
+
+# ---------- balance cache ----------
+# Process-local LRU of account_id -> cents for balance reads. Our own writes go
+# through _conn and update the cache directly; commits from any other connection
+# (another worker) bump PRAGMA data_version on _conn, which drops the whole cache.
+_CACHE_MAX = 0 if os.getenv("ATM_DISABLE_CACHE") == "1" else 4096
+_cache: "OrderedDict[str, int]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_gen = 0        # bumped whenever the cache is dropped
+_cache_version = None # last data_version seen on _conn
+
+def _cache_sync() -> int:
+    """Drop the cache if the DB changed since the last look; return the generation. Caller holds _cache_lock."""
+    global _cache_gen, _cache_version
+    (version,) = _writer().execute("PRAGMA data_version").fetchone()
+    if version != _cache_version:
+        _cache.clear()
+        _cache_version = version
+        _cache_gen += 1
+    return _cache_gen
+
+def _cache_store(account_id: str, cents: int, gen: int) -> None:
+    """Remember a balance read under `gen`, unless anything committed since."""
+    with _cache_lock:
+        if _cache_sync() != gen:
+            return
+        _cache[account_id] = cents
+        _cache.move_to_end(account_id)
+        if len(_cache) > _CACHE_MAX:
+            _cache.popitem(last=False)
+
+def _cache_write(account_id: str, cents: int) -> None:
+    """Write-through after a commit on _conn. Caller holds _write_lock, so no newer write can race it."""
+    global _cache_gen
+    if not _CACHE_MAX:
+        return
+    with _cache_lock:
+        _cache_gen += 1  # void in-flight reads that may have seen the old value
+        _cache[account_id] = cents
+        _cache.move_to_end(account_id)
+        if len(_cache) > _CACHE_MAX:
+            _cache.popitem(last=False)
+
+def _cache_drop() -> None:
+    """Forget everything after a bulk write on _conn (which doesn't bump its own data_version)."""
+    global _cache_gen
+    with _cache_lock:
+        _cache.clear()
+        _cache_gen += 1
+
+def _migrate_text_balances(conn: sqlite3.Connection) -> None:
+    """One-shot upgrade of the old schema that kept balances as decimal TEXT."""
+    cols = {row[1]: row[2].upper() for row in conn.execute("PRAGMA table_info(accounts)")}
+    if cols.get("balance") != "TEXT":
+        return
+    rows = conn.execute("SELECT id, balance FROM accounts").fetchall()
+    conn.execute("ALTER TABLE accounts RENAME TO accounts_text")
+    conn.execute(_SCHEMA)
+    conn.executemany(
+        _SQL_INSERT,
+        [(account_id, to_cents(Decimal(bal))) for account_id, bal in rows],
+    )
+    conn.execute("DROP TABLE accounts_text")
+    log.info("DB migrated %d balances from TEXT to INTEGER cents", len(rows))
+
 def init_db():
-    with closing(_open_conn()) as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS accounts (
-                id      TEXT PRIMARY KEY,
-                balance TEXT NOT NULL
-            )
-        """)
+    with _write_lock:
+        conn = _writer()
+        # IMMEDIATE so concurrently booting workers don't race the migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(_SCHEMA)
+            _migrate_text_balances(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _cache_drop()
     log.info("DB schema ready at %s", _db_path())
 
 def truncate_all():
-    with closing(_open_conn()) as conn:
-        conn.execute("DELETE FROM accounts")
+    with _write_lock:
+        _writer().execute(_SQL_TRUNCATE)
+        _cache_drop()
+
 
+# Demo accounts (balances in cents) for local dev/demo.
+_SEED_ROWS = (
+    ("12345", 1_050_000),  # 10500.00
+    ("777",   1_201_500),  # 12015.00
+    ("a111",    504_000),  #  5040.00
+    ("007",   4_700_000),  # 47000.00
+)
 
 def seed_if_empty() -> None:
     """Insert demo accounts if the table is empty (used for local dev/demo)."""
-    from decimal import Decimal
-    with closing(_open_conn()) as conn:
-        (n,) = conn.execute("SELECT COUNT(*) FROM accounts").fetchone()
+    with _write_lock:
+        conn = _writer()
+        (n,) = conn.execute(_SQL_COUNT).fetchone()
         if n:
             return
-        rows = [
-            ("12345", str(Decimal("10500.00"))),
-            ("777",   str(Decimal("12015.00"))),
-            ("a111",  str(Decimal("5040.00"))),
-            ("007",   str(Decimal("47000.00"))),
-        ]
-        conn.executemany("INSERT INTO accounts(id, balance) VALUES(?, ?)", rows)
-    log.info("DB seed inserted %d demo accounts", len(rows))
+        conn.executemany(_SQL_INSERT, _SEED_ROWS)
+        _cache_drop()
+    log.info("DB seed inserted %d demo accounts", len(_SEED_ROWS))
 
 
 def account_exists(account_id: str) -> bool:
-    with closing(_open_conn()) as conn:
-        row = conn.execute("SELECT 1 FROM accounts WHERE id=?", (account_id,)).fetchone()
-        return row is not None
+    with _reader() as conn:
+        return bool(conn.execute(_SQL_EXISTS, (account_id,)).fetchone()[0])
 
-def get_balance(account_id: str) -> Decimal | None:
-    with closing(_open_conn()) as conn:
-        row = conn.execute("SELECT balance FROM accounts WHERE id=?", (account_id,)).fetchone()
-        return Decimal(row[0]) if row else None
+def get_balance(account_id: str) -> int | None:
+    """Balance in integer cents, or None if the account doesn't exist."""
+    if _CACHE_MAX:
+        with _cache_lock:
+            gen = _cache_sync()
+            cents = _cache.get(account_id)
+            if cents is not None:
+                _cache.move_to_end(account_id)
+                return cents
+    with _reader() as conn:
+        row = conn.execute(_SQL_GET_BALANCE, (account_id,)).fetchone()
+    if not row:
+        return None
+    if _CACHE_MAX:
+        _cache_store(account_id, row[0], gen)
+    return row[0]
 
-def create_account(account_id: str, initial: Decimal) -> Decimal:
-    with closing(_open_conn()) as conn:
-        conn.execute("INSERT INTO accounts (id, balance) VALUES (?, ?)", (account_id, str(initial)))
-        return initial
+def create_account(account_id: str, cents: int) -> int:
+    with _write_lock:
+        _writer().execute(_SQL_INSERT, (account_id, cents))
+        _cache_write(account_id, cents)
+    return cents
 
-def deposit(account_id: str, amount: Decimal) -> Decimal | None:
+class BalanceLimitExceeded(Exception):
+    """Raised by deposit when the new balance wouldn't fit in int64 cents; carries the unchanged balance."""
+    def __init__(self, balance: int):
+        super().__init__(balance)
+        self.balance = balance
+
+def deposit(account_id: str, cents: int) -> int | None:
     """
-    Atomically add `amount` to balance.
-    Returns new balance, or None if the account doesn't exist.
+    Atomically add `cents` to balance (one autocommit UPDATE ... RETURNING).
+    Returns new balance (cents), or None if the account doesn't exist.
+    Raises BalanceLimitExceeded (balance unchanged) if the sum would pass MAX_BALANCE_CENTS.
     """
-    with closing(_open_conn()) as conn:
-        cur = conn.cursor()
-        cur.execute("BEGIN IMMEDIATE")
-        try:
-            row = cur.execute("SELECT balance FROM accounts WHERE id=?", (account_id,)).fetchone()
+    with _write_lock:
+        conn = _writer()
+        row = conn.execute(_SQL_DEPOSIT, (cents, account_id, MAX_BALANCE_CENTS - cents)).fetchone()
+        if not row:
+            # nothing updated: tell "missing" from "over the limit" (only on the failure path)
+            row = conn.execute(_SQL_GET_BALANCE, (account_id,)).fetchone()
             if not row:
-                cur.execute("ROLLBACK")
                 return None
-            old_bal = Decimal(row[0])
-            new_bal = old_bal + amount
-            cur.execute("UPDATE accounts SET balance=? WHERE id=?", (str(new_bal), account_id))
-            cur.execute("COMMIT")
-            log.info("db.deposit id=%s amount=%s new=%s", account_id, amount, new_bal)
-            return new_bal
-        except Exception:
-            cur.execute("ROLLBACK")
-            raise
+            raise BalanceLimitExceeded(row[0])
+        (new_cents,) = row
+        _cache_write(account_id, new_cents)
+    log.debug("db.deposit id=%s cents=%s new=%s", account_id, cents, new_cents)
+    return new_cents
 
-def withdraw(account_id: str, amount: Decimal) -> Decimal | None:
+class InsufficientFunds(Exception):
+    """Raised by withdraw when the balance can't cover the amount; carries the unchanged balance."""
+    def __init__(self, balance: int):
+        super().__init__(balance)
+        self.balance = balance
+
+def withdraw(account_id: str, cents: int) -> int | None:
     """
-        Atomically subtract `amount` from balance.
-        Returns:
-          - new balance on success
-          - None if account is missing
-          - old balance (unchanged) if insufficient funds (signal for repo to map to 400)
+        Atomically subtract `cents` from balance (one autocommit UPDATE ... RETURNING).
+        Returns the new balance (cents), or None if the account is missing.
+        Raises InsufficientFunds (balance unchanged) if it can't cover `cents`.
     """
-    with closing(_open_conn()) as conn:
-        cur = conn.cursor()
-        cur.execute("BEGIN IMMEDIATE")
-        try:
-            row = cur.execute("SELECT balance FROM accounts WHERE id=?", (account_id,)).fetchone()
+    with _write_lock:
+        conn = _writer()
+        row = conn.execute(_SQL_WITHDRAW, (cents, account_id, cents)).fetchone()
+        if not row:
+            # nothing updated: tell "missing" from "insufficient" (only on the failure path)
+            row = conn.execute(_SQL_GET_BALANCE, (account_id,)).fetchone()
             if not row:
-                cur.execute("ROLLBACK")
                 return None
-            old_bal = Decimal(row[0])
-            if amount > old_bal:
-                cur.execute("ROLLBACK")
-                return old_bal  # repo maps to 400
-            new_bal = old_bal - amount
-            cur.execute("UPDATE accounts SET balance=? WHERE id=?", (str(new_bal), account_id))
-            cur.execute("COMMIT")
-            log.info("db.withdraw id=%s amount=%s new=%s", account_id, amount, new_bal)
-            return new_bal
-        except Exception:
-            cur.execute("ROLLBACK")
-            raise
\ No newline at end of file
+            raise InsufficientFunds(row[0])
+        (new_cents,) = row
+        _cache_write(account_id, new_cents)
+    log.debug("db.withdraw id=%s cents=%s new=%s", account_id, cents, new_cents)
+    return new_cents
@@ -1,25 +1,19 @@
 import logging
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Union
+from typing import Annotated
 from fastapi import Path
-from pydantic import BaseModel, Field, StrictInt, StrictFloat, field_validator
+from pydantic import AfterValidator, BaseModel, BeforeValidator, ConfigDict, Field, field_validator
 
 logger = logging.getLogger(__name__)
 
-AccountID = Path(
-    ...,
+# Single definition used by every route; pydantic-core compiles the pattern once
+# when the routes are built and matches it in Rust per request.
+AccountID = Annotated[str, Path(
     min_length=1,
     max_length=64,
     pattern=r"^[A-Za-z0-9_\-]+$",
     description="Account identifier (1–64 chars, letters/digits/_/- only)",
-)
-
-# def q2(x: Decimal) -> Decimal:
-#     return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-#
-# def as_number(x: Decimal) -> float:
-#     return float(q2(x))
-from decimal import Decimal, ROUND_HALF_UP
+)]
 
 TWOPL = Decimal("0.01")
 
@@ -27,16 +21,62 @@ def q2(x: Decimal) -> Decimal:
     """Quantize to 2 decimal places, HALF UP (bank-like display)."""
     return x.quantize(TWOPL, rounding=ROUND_HALF_UP)
 
-def as_number(x: Decimal) -> float:
-    """Convert Decimal to JSON number using 2dp HALF UP."""
-    return float(q2(x))
+def to_cents(x: Decimal) -> int:
+    """Integer cents of a Decimal amount (2dp HALF UP)."""
+    return int(q2(x).scaleb(2))
+
+def as_number(cents: int) -> float:
+    """Convert integer cents to a JSON number (exact to 2dp: true division is correctly rounded)."""
+    return cents / 100
+
+def _json_number(v: object) -> object:
+    """Keep the wire contract numeric: JSON strings are rejected before Decimal coercion."""
+    if isinstance(v, str):
+        raise ValueError("must be a JSON number")
+    return v
+
+# Validated straight into a 2dp Decimal (pydantic-core parses floats via their repr,
+# so 0.1 -> Decimal("0.1")); handlers turn it into integer cents once.
+# The cap bounds a single amount (its cents always fit an int64 parameter); it does not
+# bound the running balance - db.deposit enforces that against MAX_BALANCE_CENTS.
+MAX_AMOUNT = Decimal(10) ** 16
+Amount = Annotated[Decimal, BeforeValidator(_json_number), Field(le=MAX_AMOUNT), AfterValidator(q2)]
+
+# Request bodies are immutable value objects; unknown keys are a client bug.
+_BODY_CONFIG = ConfigDict(frozen=True, extra="forbid")
 
 class Money(BaseModel):
-    amount: Union[StrictInt, StrictFloat] = Field(..., description="Positive numeric amount (> 0)")
+    model_config = _BODY_CONFIG
+
+    amount: Amount = Field(..., description="Positive amount (> 0), rounded HALF UP to 2dp")
 
     @field_validator("amount")
     @classmethod
-    def _positive(cls, v):
+    def _positive(cls, v: Decimal) -> Decimal:
         if v <= 0:
             raise ValueError("amount must be > 0")
-        return v
\ No newline at end of file
+        return v
+
+class CreateBody(BaseModel):
+    model_config = _BODY_CONFIG
+
+    # optional initial balance; default 0
+    initial_balance: Amount | None = Field(Decimal("0.00"), description="Initial amount (>= 0)")
+
+    @field_validator("initial_balance", mode="before")
+    @classmethod
+    def _non_negative(cls, v: object) -> object:
+        # check the raw number: after q2, -0.004 would already be 0.00
+        if isinstance(v, (int, float)) and not isinstance(v, bool) and v < 0:
+            raise ValueError("initial_balance must be >= 0")
+        return v
+
+    @field_validator("initial_balance")
+    @classmethod
+    def _default_zero(cls, v: Decimal | None) -> Decimal:
+        return Decimal("0.00") if v is None else v
+
+class AccountBalance(BaseModel):
+    """Response body of every account endpoint."""
+    account_number: str
+    balance: float
@@ -1,31 +1,52 @@
+import atexit
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import sys
 
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
 
+# Set per request by RequestIDMiddleware; "-" outside of a request.
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+class RequestIDFilter(logging.Filter):
+    """Stamps the current request id (from the contextvar) onto every record."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
 def setup_logging():
     """
-    Structured logging to console + daily-rotated file.
-    - Rotates at midnight and keeps 7 days of history.
+    Structured logging to console + size-rotated file.
+    - Rotates at 10 MiB and keeps 7 old files.
     - Format includes request ID injected by middleware.
+    - Request threads only enqueue records; a listener thread does the console/file I/O.
+    - LOG_LEVEL env var sets the root level (default INFO; per-operation DB logs are DEBUG).
     """
     root = logging.getLogger()
     if root.handlers:
         # Avoid double configuration if reloaded
         return
 
-    root.setLevel(logging.INFO)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
-    fmt = logging.Formatter("%(asctime)s [%(levelname)s] [%(name)s] %(message)s")
+    fmt = logging.Formatter("%(asctime)s [%(levelname)s] [%(name)s] [%(request_id)s] %(message)s")
 
     console = logging.StreamHandler(sys.stdout)
     console.setFormatter(fmt)
-    root.addHandler(console)
 
-    file_handler = TimedRotatingFileHandler(LOG_FILE, when="midnight", backupCount=7, encoding="utf-8")
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=7, encoding="utf-8")
     file_handler.setFormatter(fmt)
-    root.addHandler(file_handler)
\ No newline at end of file
+
+    # The filter must run on the enqueuing side: the request id lives in the caller's context.
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIDFilter())
+    root.addHandler(queue_handler)
+
+    listener = QueueListener(queue_handler.queue, console, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
@@ -1,43 +1,42 @@
-from decimal import Decimal
 import logging
 from fastapi import HTTPException
 from . import db
 
 log = logging.getLogger("repo")
 
-def get_balance(account_id: str) -> Decimal | None:
+def get_balance(account_id: str) -> int | None:
     return db.get_balance(account_id)
 
-def create_account(account_id: str, initial: Decimal) -> Decimal:
+def create_account(account_id: str, initial: int) -> int:
     try:
         bal = db.create_account(account_id, initial)
     except Exception as e:
         log.info("create_account conflict id=%s", account_id)
         raise HTTPException(status_code=409, detail=f"Account '{account_id}' already exists") from e
-    log.info("create_account id=%s initial=%s", account_id, bal)
+    log.info("create_account id=%s initial_cents=%s", account_id, bal)
     return bal
 
-def deposit(account_id: str, amount: Decimal) -> Decimal:
-    new_bal = db.deposit(account_id, amount)
+def deposit(account_id: str, amount: int) -> int:
+    try:
+        new_bal = db.deposit(account_id, amount)
+    except db.BalanceLimitExceeded as e:
+        log.info("deposit over limit id=%s amount_cents=%s balance_cents=%s", account_id, amount, e.balance)
+        raise HTTPException(status_code=400, detail="balance limit exceeded") from e
     if new_bal is None:
         log.info("deposit: account %s not found", account_id)
         raise HTTPException(status_code=404, detail=f"Account '{account_id}' does not exist")
-    log.info("deposit id=%s amount=%s new_balance=%s", account_id, amount, new_bal)
+    log.info("deposit id=%s amount_cents=%s new_balance_cents=%s", account_id, amount, new_bal)
     return new_bal
 
-def withdraw(account_id: str, amount: Decimal) -> Decimal:
-    pre = db.get_balance(account_id)
-    if pre is None:
+def withdraw(account_id: str, amount: int) -> int:
+    try:
+        new_bal = db.withdraw(account_id, amount)
+    except db.InsufficientFunds as e:
+        log.info("withdraw insufficient id=%s amount_cents=%s balance_cents=%s", account_id, amount, e.balance)
+        raise HTTPException(status_code=400, detail="insufficient funds") from e
+    if new_bal is None:
         log.info("withdraw: account %s not found", account_id)
         raise HTTPException(status_code=404, detail=f"Account '{account_id}' does not exist")
 
-    new_bal = db.withdraw(account_id, amount)
-
-    # If DB rolled back for insufficient funds, it returns the *old* balance (pre).
-    # Detect that and emit 400.
-    if new_bal == pre and amount > pre:
-        log.info("withdraw insufficient id=%s amount=%s balance=%s", account_id, amount, pre)
-        raise HTTPException(status_code=400, detail="insufficient funds")
-
-    log.info("withdraw id=%s amount=%s new_balance=%s", account_id, amount, new_bal)
-    return new_bal
\ No newline at end of file
+    log.info("withdraw id=%s amount_cents=%s new_balance_cents=%s", account_id, amount, new_bal)
+    return new_bal
@@ -1,30 +1,44 @@
 # tests/conftest.py
 import os
-import tempfile
+import sqlite3
+import uuid
+from contextlib import closing
 import pytest
 from starlette.testclient import TestClient
 
 from src.app import create_app
 from src import db
 
+# Shared by every test module: one app, one DB and one client per session (per
+# xdist worker), so the app's lifespan and schema init run exactly once.
+
 @pytest.fixture(scope="session")
-def tmp_db_path():
-    with tempfile.TemporaryDirectory() as d:
-        yield os.path.join(d, "test.sqlite3")  # removed automatically
+def tmp_db_path(request):
+    # Shared-cache in-memory SQLite DB: no disk I/O. It lives as long as one connection
+    # is open, so hold a sentinel across the session (the app may reset its own).
+    # One DB per pytest-xdist worker ("main" when not running under -n).
+    worker = getattr(request.config, "workerinput", {}).get("workerid", "main")
+    path = f"file:atm_test_{worker}_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    with closing(sqlite3.connect(path, uri=True)):
+        yield path
 
 @pytest.fixture(scope="session")
 def app(tmp_db_path):
     os.environ["ATM_DB_PATH"] = tmp_db_path     # <-- TEST-ONLY DB
+    os.environ["ATM_DISABLE_SEED"] = "1"        # lifespan runs in the session client
     db.reset_connection()                       # if you cache a conn
     db.init_db()
     return create_app()
 
-@pytest.fixture(autouse=True)
-def clean_db():
-    db.truncate_all()   # isolation between tests
-    yield
+@pytest.fixture(scope="session", autouse=True)
+def _empty_db_at_start(app):
+    # Start the session from an empty table. Tests isolate themselves with unique
+    # account ids (acct()), so there's no per-test wipe to serialize them.
     db.truncate_all()
 
-@pytest.fixture()
+@pytest.fixture(scope="session")
 def client(app):
-    return TestClient(app)
\ No newline at end of file
+    # One client (and lifespan/event-loop portal) for the whole session; per-test
+    # isolation comes from unique account ids
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,23 @@
+# tests/helpers.py
+# Account ids and 2dp money assertions shared by the local and the remote suites.
+import random
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+
+# Account ids come from a PRNG seeded once from the OS (no urandom read per id, still
+# unique across runs); 48 random bits, the same as the 12 hex chars of a uuid4 they replace.
+_acct_rng = random.Random(uuid.uuid4().int)
+
+def acct() -> str:
+    return f"acct_{_acct_rng.getrandbits(48):012x}"
+
+# Decimal constants for the 2dp assertions (built once, not per assert)
+Q2 = Decimal("0.01")
+
+def d2(x) -> Decimal:
+    """A JSON balance as a 2dp Decimal, rounding HALF UP like the API."""
+    return Decimal(str(x)).quantize(Q2, ROUND_HALF_UP)
+
+def eq2(x, y) -> bool:
+    """x == y at 2dp, rounding HALF UP like the API (round() is banker's rounding on floats)."""
+    return d2(x) == d2(y)